@@ -28,9 +28,10 @@ Usage:
     result = td.run("ls -la")
 """
 
+import json
 import shlex
 import requests
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional
 
 # Connection state
 _url: Optional[str] = None
@@ -98,6 +99,14 @@ def read(path: str) -> str:
     return data.get("content", "")
 
 
+def read_bytes(path: str) -> bytes:
+    """Read raw file bytes (works for large and binary files)"""
+    _require_connection()
+    r = requests.get(f"{_url}/fs/read", headers=_headers, params={"path": path, "raw": "true"})
+    r.raise_for_status()
+    return r.content
+
+
 def write(path: str, content: str, append: bool = False) -> dict:
     """Write content to file"""
     _require_connection()
@@ -152,6 +161,33 @@ def execute(cmd: List[str], cwd: str = "/", timeout: int = 60, env: Optional[Dic
     return r.json()
 
 
+def execute_stream(cmd: List[str], cwd: str = "/", timeout: int = 60, env: Optional[Dict[str, str]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Execute command, yielding output as it is produced
+
+    Args:
+        cmd: Command as list ["ls", "-la"]
+        cwd: Working directory
+        timeout: Timeout in seconds
+
+    Yields:
+        Dicts with a "stdout" or "stderr" chunk, then a final "returncode"
+        (or "error" if the command timed out)
+    """
+    _require_connection()
+    with requests.post(
+        f"{_url}/exec",
+        headers=_headers,
+        params={"stream": "true"},
+        json={"cmd": cmd, "cwd": cwd, "timeout": timeout, "env": env},
+        stream=True,
+    ) as r:
+        r.raise_for_status()
+        for line in r.iter_lines():
+            if line:
+                yield json.loads(line)
+
+
 def run(cmd_string: str, cwd: str = "/") -> str:
     """
     Run shell command (convenience wrapper)
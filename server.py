@@ -10,19 +10,32 @@ Usage:
 """
 
 import argparse
+import asyncio
+import codecs
+import errno
+import hmac
+import io
 import os
 import secrets
 import socket
+import stat
 import subprocess
 import shutil
 import sys
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Optional, List
+from typing import Optional
 from datetime import datetime
 
-from fastapi import FastAPI, HTTPException, Header, Query
+import anyio
+import httpx
+import orjson
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Header, Query
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, ConfigDict
+from starlette.datastructures import Headers
 import uvicorn
 
 # ==============================================================================
@@ -55,6 +68,7 @@ LEVELS = {
 
 # Current access level (set by CLI)
 ACCESS = LEVELS["limited"]
+ACCESS_NAME = "limited"
 
 # ==============================================================================
 # Configuration
@@ -63,6 +77,12 @@ ACCESS = LEVELS["limited"]
 PORT = 6969
 DEFAULT_ROOT = Path.cwd()
 TOKEN_FILE = Path.home() / ".trapdoor" / "token"
+OLLAMA_HOST = os.getenv("OLLAMA_HOST")
+MAX_BODY = 64 * 1024 * 1024
+
+# Internal handoff from main() to --workers processes; not a user setting
+WORKER_ACCESS_ENV = "_TRAPDOOR_WORKER_ACCESS"
+WORKER_ROOT_ENV = "_TRAPDOOR_WORKER_ROOT"
 
 # ==============================================================================
 # Token Management
@@ -77,114 +97,255 @@ def set_token(token: str) -> str:
 
 def get_or_create_token() -> str:
     """Get existing token or create a new one"""
-    if TOKEN_FILE.exists():
+    try:
         return TOKEN_FILE.read_text().strip()
-    return set_token(secrets.token_hex(16))
+    except FileNotFoundError:
+        return set_token(secrets.token_hex(16))
 
 
 def rotate_token() -> str:
     """Rotate auth token and persist it"""
-    return set_token(secrets.token_hex(16))
+    global TOKEN, AUTH_HEADER
+    TOKEN = set_token(secrets.token_hex(16))
+    AUTH_HEADER = f"Bearer {TOKEN}".encode()
+    return TOKEN
 
 
 TOKEN = get_or_create_token()
+AUTH_HEADER = f"Bearer {TOKEN}".encode()
 
-def find_open_port(start: int = 8080, max_tries: int = 100) -> int:
-    """Find an open port starting from start"""
-    for port in range(start, start + max_tries):
+def find_open_port(start: int = 8080) -> int:
+    """Use start if it is free, otherwise let the kernel pick an open port"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        # Match uvicorn's listener so TIME_WAIT leftovers don't count as taken
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.bind(('0.0.0.0', port))
-                return port
+            s.bind(('0.0.0.0', start))
         except OSError:
-            continue
-    raise RuntimeError(f"No open port found in range {start}-{start + max_tries}")
+            s.bind(('0.0.0.0', 0))
+        return s.getsockname()[1]
 
 # ==============================================================================
 # Sandbox Root
 # ==============================================================================
 
 ROOT = DEFAULT_ROOT
+ROOT_FD: Optional[int] = None
 
 
 def set_root(path: str):
-    global ROOT
+    global ROOT, ROOT_FD
     ROOT = Path(path).expanduser().resolve()
     ROOT.mkdir(parents=True, exist_ok=True)
+    if ROOT_FD is not None:
+        os.close(ROOT_FD)
+    ROOT_FD = os.open(ROOT, os.O_RDONLY | os.O_DIRECTORY)
+
+
+def root_fd() -> int:
+    """Directory fd for ROOT, opened on first use if set_root() never ran"""
+    global ROOT_FD
+    if ROOT_FD is None:
+        ROOT_FD = os.open(ROOT, os.O_RDONLY | os.O_DIRECTORY)
+    return ROOT_FD
 
 
-def resolve_path(path: str) -> Path:
+def resolve_path(path: str) -> str:
     """Resolve user path into sandboxed root, preventing escape."""
+    root = str(ROOT)
     if path == "/":
-        target = ROOT
-    else:
-        candidate = Path(path).expanduser()
-        target = candidate.resolve() if candidate.is_absolute() else (ROOT / candidate).resolve()
+        return root
 
-    try:
-        target.relative_to(ROOT)
-    except ValueError:
+    # join() keeps absolute paths as-is and anchors relative ones at ROOT
+    target = os.path.realpath(os.path.join(root, os.path.expanduser(path)))
+
+    if target != root and not target.startswith(root.rstrip(os.sep) + os.sep):
         raise HTTPException(status_code=403, detail="Path escapes sandbox root")
 
     return target
 
 
+# open() fails with these on sockets and other special files that exist but
+# can't be read as a stream
+UNOPENABLE = (errno.ENXIO, errno.EOPNOTSUPP)
+
+
+def open_in_root(target: str) -> int:
+    """Open a resolved path for reading relative to the root fd"""
+    # O_NOFOLLOW only refuses a symlink in the final component; a parent
+    # directory swapped for a symlink after resolve_path() ran is still
+    # followed. O_NONBLOCK keeps a FIFO from hanging the open.
+    try:
+        return os.open(
+            os.path.relpath(target, ROOT),
+            os.O_RDONLY | os.O_NOFOLLOW | os.O_NONBLOCK,
+            dir_fd=root_fd(),
+        )
+    except OSError as e:
+        if e.errno == errno.ELOOP:
+            raise HTTPException(status_code=403, detail="Path escapes sandbox root")
+        raise
+
+
 # FastAPI App
 # ==============================================================================
 
+# Shared client so chat requests reuse keep-alive connections to Ollama
+ollama_client = httpx.AsyncClient(base_url=OLLAMA_HOST, timeout=None) if OLLAMA_HOST else None
+
+
+def load_worker_config():
+    """Apply the CLI choices main() passes to --workers processes"""
+    level_name = os.environ.get(WORKER_ACCESS_ENV)
+    if level_name is not None:
+        set_access(level_name)
+    root = os.environ.get(WORKER_ROOT_ENV)
+    if root is not None:
+        set_root(root)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    load_worker_config()
+    yield
+    if ollama_client:
+        await ollama_client.aclose()
+
+
+class BodySizeLimitMiddleware:
+    """Reject requests whose Content-Length exceeds MAX_BODY before the body is read"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            for name, value in scope["headers"]:
+                if name == b"content-length":
+                    if value.isdigit() and int(value) > MAX_BODY:
+                        response = ORJSONResponse({"detail": "Request body too large"}, status_code=413)
+                        await response(scope, receive, send)
+                        return
+                    break
+        await self.app(scope, receive, send)
+
+
+class SelectiveGZipMiddleware:
+    """GZipMiddleware that leaves raw file bytes and streamed exec output alone"""
+
+    excluded_types = ("application/octet-stream", "application/x-ndjson")
+    # GZipMiddleware passes through any response that already has a
+    # Content-Encoding, so excluded responses get one on the way in and it
+    # is stripped again before anything reaches the client
+    marker = (b"content-encoding", b"identity")
+
+    def __init__(self, app, **options):
+        self.app = app
+        self.gzip = GZipMiddleware(self.mark_excluded, **options)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def unmark(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [h for h in message["headers"] if h != self.marker]
+            await send(message)
+
+        await self.gzip(scope, receive, unmark)
+
+    async def mark_excluded(self, scope, receive, send):
+        async def mark(message):
+            if message["type"] == "http.response.start":
+                content_type = Headers(raw=message["headers"]).get("content-type", "")
+                if content_type.startswith(self.excluded_types):
+                    message["headers"] = [*message["headers"], self.marker]
+            await send(message)
+
+        await self.app(scope, receive, mark)
+
+
 app = FastAPI(
     title="Trapdoor 1.0",
     description="Give cloud AIs safe access to your local machine",
-    version="0.1.1"
+    version="0.1.1",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
+# Plain ASGI rather than @app.middleware so responses aren't re-streamed
+# (which would defeat GZip's minimum_size). Added first so CORS wraps the 413.
+app.add_middleware(BodySizeLimitMiddleware)
+
 # CORS is open because the whole point is cross-origin access
 # from cloud AI sandboxes, tunnels, and external clients.
 # Auth token is the access control layer, not CORS.
+# Methods and headers are listed explicitly so the middleware doesn't have
+# to echo request headers back, and browsers cache preflights for a day.
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["authorization", "content-type"],
+    max_age=86400,
 )
 
+# File contents and command output compress well, and tunnels are usually
+# the bottleneck. Level 1 gets most of the savings for little CPU.
+app.add_middleware(SelectiveGZipMiddleware, minimum_size=1024, compresslevel=1)
+
 # ==============================================================================
 # Authentication
 # ==============================================================================
 
-def require_auth(authorization: Optional[str] = Header(None)) -> str:
+async def require_auth(authorization: Optional[str] = Header(None)) -> str:
     """Validate Bearer token"""
     if not authorization or not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Missing Authorization header")
 
-    token = authorization.split(" ", 1)[1]
-    if token != TOKEN:
+    # Header values are latin-1 decoded by Starlette; compare in constant time
+    if not hmac.compare_digest(authorization.encode("latin-1"), AUTH_HEADER):
         raise HTTPException(status_code=403, detail="Invalid token")
 
-    return token
+    return TOKEN
+
+
+# Everything except /health sits behind the token
+api = APIRouter(dependencies=[Depends(require_auth)])
 
 # ==============================================================================
 # Request/Response Models
 # ==============================================================================
 
 class WriteRequest(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
     path: str
     content: str
     mode: str = "write"
 
 class MkdirRequest(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
     path: str
 
 class RmRequest(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
     path: str
 
 class ExecRequest(BaseModel):
-    cmd: List[str]
+    model_config = ConfigDict(extra="ignore")
+
+    cmd: list[str]
     cwd: str = "/"
     timeout: int = 60
     env: Optional[dict] = None
 
 class ChatRequest(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
     model: str = "gpt-4"
     messages: list
 
@@ -192,211 +353,331 @@ class ChatRequest(BaseModel):
 # Health Endpoint
 # ==============================================================================
 
-@app.get("/health")
-def health():
-    """Health check - shows current access level"""
-    level_name = next((k for k, v in LEVELS.items() if v == ACCESS), "unknown")
+def build_health() -> dict:
+    """Static part of the health payload; rebuilt whenever ACCESS changes"""
     return {
         "status": "ok",
         "version": "0.1.1",
-        "access_level": level_name,
+        "access_level": ACCESS_NAME,
         "permissions": {
             "read": ACCESS["fs_read"],
             "write": ACCESS["fs_write"],
             "delete": ACCESS["fs_delete"],
             "exec": ACCESS["exec"],
         },
-        "timestamp": datetime.now().isoformat()
     }
 
+
+HEALTH = build_health()
+
+
+def set_access(level_name: str):
+    global ACCESS, ACCESS_NAME, HEALTH
+    if level_name not in LEVELS:
+        raise ValueError(f"Unknown access level {level_name!r} (expected one of: {', '.join(LEVELS)})")
+    ACCESS = LEVELS[level_name]
+    ACCESS_NAME = level_name
+    HEALTH = build_health()
+
+
+@app.get("/health")
+async def health():
+    """Health check - shows current access level"""
+    return ORJSONResponse({**HEALTH, "timestamp": datetime.now().isoformat()})
+
 # ==============================================================================
 # Filesystem Endpoints
 # ==============================================================================
 
-@app.get("/fs/ls")
-def fs_ls(
-    path: str = Query("/"),
-    authorization: Optional[str] = Header(None)
-):
+@api.get("/fs/ls")
+def fs_ls(path: str = Query("/")):
     """List directory contents"""
-    require_auth(authorization)
-
     if not ACCESS["fs_read"]:
         raise HTTPException(status_code=403, detail="Read access disabled")
 
     target = resolve_path(path)
 
-    if not target.exists():
+    try:
+        fd = open_in_root(target)
+        st = os.fstat(fd)
+    except (FileNotFoundError, NotADirectoryError):
         raise HTTPException(status_code=404, detail=f"Path not found: {path}")
+    except OSError as e:
+        if not isinstance(e, PermissionError) and e.errno not in UNOPENABLE:
+            raise
+        # Metadata doesn't need read permission or an openable file type,
+        # so stat what can't be opened
+        fd = None
+        st = os.stat(os.path.relpath(target, ROOT), dir_fd=root_fd(), follow_symlinks=False)
 
-    if not target.is_dir():
-        stat = target.stat()
-        return {
-            "path": str(target),
-            "type": "file",
-            "size": stat.st_size,
-            "modified": datetime.fromtimestamp(stat.st_mtime).isoformat()
-        }
-
-    entries = []
-    for item in sorted(target.iterdir()):
-        try:
-            stat = item.stat()
-            entries.append({
-                "name": item.name,
-                "type": "dir" if item.is_dir() else "file",
-                "size": stat.st_size if item.is_file() else None,
-            })
-        except PermissionError:
-            entries.append({"name": item.name, "type": "unknown", "error": "permission denied"})
+    try:
+        if not stat.S_ISDIR(st.st_mode):
+            return {
+                "path": target,
+                "type": "file",
+                "size": st.st_size,
+                "modified": datetime.fromtimestamp(st.st_mtime).isoformat()
+            }
+
+        if fd is None:
+            raise HTTPException(status_code=403, detail=f"Permission denied: {path}")
+
+        # scandir reuses d_type from getdents, so only files need a stat() call
+        entries = []
+        with os.scandir(fd) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir()
+                    entries.append({
+                        "name": entry.name,
+                        "type": "dir" if is_dir else "file",
+                        "size": entry.stat().st_size if not is_dir and entry.is_file() else None,
+                    })
+                except PermissionError:
+                    entries.append({"name": entry.name, "type": "unknown", "error": "permission denied"})
+    finally:
+        if fd is not None:
+            os.close(fd)
+    entries.sort(key=lambda e: e["name"])
 
-    return {"path": str(target), "entries": entries}
+    return {"path": target, "entries": entries}
 
 
-@app.get("/fs/read")
-def fs_read(
+def open_file(path: str) -> tuple[str, io.FileIO, os.stat_result]:
+    """Resolve path and open it as a regular file through the root fd"""
+    target = resolve_path(path)
+
+    try:
+        fd = open_in_root(target)
+    except (FileNotFoundError, NotADirectoryError):
+        raise HTTPException(status_code=404, detail=f"File not found: {path}")
+    except OSError as e:
+        if e.errno in UNOPENABLE:
+            raise HTTPException(status_code=400, detail=f"Not a file: {path}")
+        raise
+
+    st = os.fstat(fd)
+    if not stat.S_ISREG(st.st_mode):
+        os.close(fd)
+        raise HTTPException(status_code=400, detail=f"Not a file: {path}")
+
+    return target, io.FileIO(fd, "rb"), st
+
+
+def read_file(path: str) -> tuple[str, os.stat_result, bytes]:
+    target, f, st = open_file(path)
+    with f:
+        return target, st, f.readall()
+
+
+async def stream_file(f: io.FileIO):
+    """Yield a file's bytes from its already-open descriptor"""
+    with f:
+        while chunk := await anyio.to_thread.run_sync(f.read, 65536):
+            yield chunk
+
+
+@api.get("/fs/read")
+async def fs_read(
     path: str,
-    authorization: Optional[str] = Header(None)
+    raw: bool = Query(False)
 ):
-    """Read file contents"""
-    require_auth(authorization)
-
+    """Read file contents (raw=true streams the bytes instead of JSON)"""
     if not ACCESS["fs_read"]:
         raise HTTPException(status_code=403, detail="Read access disabled")
 
-    target = resolve_path(path)
-
-    if not target.exists():
-        raise HTTPException(status_code=404, detail=f"File not found: {path}")
+    if raw:
+        # Stream from the fd that was opened and checked rather than
+        # reopening by path
+        _, f, st = await anyio.to_thread.run_sync(open_file, path)
+        return StreamingResponse(
+            stream_file(f),
+            media_type="application/octet-stream",
+            headers={"X-Size": str(st.st_size)},
+        )
 
-    if not target.is_file():
-        raise HTTPException(status_code=400, detail=f"Not a file: {path}")
+    target, st, data = await anyio.to_thread.run_sync(read_file, path)
 
     try:
-        content = target.read_text()
-        return {"path": str(target), "content": content, "size": len(content)}
+        content = data.decode()
     except UnicodeDecodeError:
-        return {"path": str(target), "error": "binary file", "size": target.stat().st_size}
+        return {"path": target, "error": "binary file", "size": st.st_size}
 
+    # Return the response directly so the file body skips jsonable_encoder
+    return ORJSONResponse({"path": target, "content": content, "size": len(content)})
 
-@app.post("/fs/write")
-def fs_write(
-    req: WriteRequest,
-    authorization: Optional[str] = Header(None)
-):
-    """Write content to file"""
-    require_auth(authorization)
 
+def write_file(path: str, content: str, append: bool = False) -> str:
+    """Append via O_APPEND, or replace the file atomically through a temp file"""
+    target = resolve_path(path)
+    parent, name = os.path.split(target)
+    os.makedirs(parent, exist_ok=True)
+    data = content.encode()
+
+    if append:
+        fd = os.open(target, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o666)
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+        return target
+
+    # Existing files keep their permission bits; new ones get 0666 minus the
+    # umask at creation, like a plain open() would
+    try:
+        mode = os.stat(target).st_mode & 0o7777
+    except FileNotFoundError:
+        mode = None
+
+    tmp = os.path.join(parent, f".{name}.{secrets.token_hex(8)}")
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666 if mode is None else 0o600)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        if mode is not None:
+            os.chmod(tmp, mode)
+        os.replace(tmp, target)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+    return target
+
+
+@api.post("/fs/write")
+async def fs_write(req: WriteRequest):
+    """Write content to file"""
     if not ACCESS["fs_write"]:
         raise HTTPException(status_code=403, detail="Write access disabled. Start with --solid or --full")
 
-    target = resolve_path(req.path)
-    target.parent.mkdir(parents=True, exist_ok=True)
-
-    if req.mode == "append":
-        with open(target, "a") as f:
-            f.write(req.content)
-    else:
-        target.write_text(req.content)
+    target = await anyio.to_thread.run_sync(write_file, req.path, req.content, req.mode == "append")
 
-    return {"path": str(target), "written": len(req.content), "mode": req.mode}
+    return {"path": target, "written": len(req.content), "mode": req.mode}
 
 
-@app.post("/fs/mkdir")
-def fs_mkdir(
-    req: MkdirRequest,
-    authorization: Optional[str] = Header(None)
-):
+@api.post("/fs/mkdir")
+def fs_mkdir(req: MkdirRequest):
     """Create directory"""
-    require_auth(authorization)
-
     if not ACCESS["fs_write"]:
         raise HTTPException(status_code=403, detail="Write access disabled. Start with --solid or --full")
 
     target = resolve_path(req.path)
-    target.mkdir(parents=True, exist_ok=True)
+    os.makedirs(target, exist_ok=True)
 
-    return {"path": str(target), "created": True}
+    return {"path": target, "created": True}
 
 
-@app.post("/fs/rm")
-def fs_rm(
-    req: RmRequest,
-    authorization: Optional[str] = Header(None)
-):
+@api.post("/fs/rm")
+def fs_rm(req: RmRequest):
     """Remove file or directory"""
-    require_auth(authorization)
-
     if not ACCESS["fs_delete"]:
         raise HTTPException(status_code=403, detail="Delete access disabled. Start with --full")
 
     target = resolve_path(req.path)
 
-    if not target.exists():
+    try:
+        st = os.stat(target)
+    except (FileNotFoundError, NotADirectoryError):
         raise HTTPException(status_code=404, detail=f"Path not found: {req.path}")
 
-    if target.is_dir():
+    if stat.S_ISDIR(st.st_mode):
         shutil.rmtree(target)
     else:
-        target.unlink()
+        os.unlink(target)
 
-    return {"path": str(target), "removed": True}
+    return {"path": target, "removed": True}
 
 # ==============================================================================
 # Command Execution
 # ==============================================================================
 
-@app.post("/exec")
-def exec_command(
-    req: ExecRequest,
-    authorization: Optional[str] = Header(None)
-):
-    """Execute shell command"""
-    require_auth(authorization)
+async def stream_exec(proc: asyncio.subprocess.Process, timeout: int):
+    """Yield NDJSON lines of stdout/stderr chunks as they arrive, then the exit code"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    # Bounded so a slow client stalls the pumps, and pipe backpressure the child
+    queue: asyncio.Queue = asyncio.Queue(maxsize=8)
+
+    async def pump(reader: asyncio.StreamReader, name: str):
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        while chunk := await reader.read(65536):
+            await queue.put({name: decoder.decode(chunk)})
+        await queue.put({name: decoder.decode(b"", final=True)})
+        await queue.put(None)
+
+    pumps = [
+        asyncio.create_task(pump(proc.stdout, "stdout")),
+        asyncio.create_task(pump(proc.stderr, "stderr")),
+    ]
+    try:
+        open_pipes = len(pumps)
+        while open_pipes:
+            item = await asyncio.wait_for(queue.get(), deadline - loop.time())
+            if item is None:
+                open_pipes -= 1
+            elif any(item.values()):
+                yield orjson.dumps(item) + b"\n"
+        returncode = await asyncio.wait_for(proc.wait(), deadline - loop.time())
+        yield orjson.dumps({"returncode": returncode}) + b"\n"
+    except asyncio.TimeoutError:
+        yield orjson.dumps({"error": f"Command timed out after {timeout}s"}) + b"\n"
+    finally:
+        for task in pumps:
+            task.cancel()
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
 
+
+@api.post("/exec")
+async def exec_command(req: ExecRequest, stream: bool = Query(False)):
+    """Execute shell command (stream=true returns output as NDJSON while it runs)"""
     if not ACCESS["exec"]:
         raise HTTPException(status_code=403, detail="Exec disabled. Start with --full to enable")
 
+    cwd = await anyio.to_thread.run_sync(resolve_path, req.cwd)
+
     try:
-        result = subprocess.run(
-            req.cmd,
-            cwd=resolve_path(req.cwd),
-            capture_output=True,
-            text=True,
-            timeout=req.timeout,
+        proc = await asyncio.create_subprocess_exec(
+            *req.cmd,
+            cwd=cwd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
             env=req.env
         )
-
-        return {
-            "cmd": req.cmd,
-            "cwd": req.cwd,
-            "stdout": result.stdout,
-            "stderr": result.stderr,
-            "returncode": result.returncode
-        }
-    except subprocess.TimeoutExpired:
-        raise HTTPException(status_code=408, detail=f"Command timed out after {req.timeout}s")
     except FileNotFoundError:
         raise HTTPException(status_code=400, detail=f"Command not found: {req.cmd[0]}")
 
+    if stream:
+        return StreamingResponse(stream_exec(proc, req.timeout), media_type="application/x-ndjson")
+
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=req.timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        raise HTTPException(status_code=408, detail=f"Command timed out after {req.timeout}s")
+
+    return {
+        "cmd": req.cmd,
+        "cwd": req.cwd,
+        "stdout": stdout.decode(errors="replace"),
+        "stderr": stderr.decode(errors="replace"),
+        "returncode": proc.returncode
+    }
+
 # ==============================================================================
 # Chat Proxy (Optional)
 # ==============================================================================
 
-@app.post("/v1/chat/completions")
-def chat_completions(
-    req: ChatRequest,
-    authorization: Optional[str] = Header(None)
-):
+@api.post("/v1/chat/completions")
+async def chat_completions(req: ChatRequest):
     """OpenAI-compatible chat endpoint (optional LLM proxy)"""
-    require_auth(authorization)
-
-    ollama_host = os.getenv("OLLAMA_HOST")
-
-    if ollama_host:
-        import requests
-        resp = requests.post(
-            f"{ollama_host}/v1/chat/completions",
+    if ollama_client:
+        resp = await ollama_client.post(
+            "/v1/chat/completions",
             json={"model": req.model, "messages": req.messages}
         )
         return resp.json()
@@ -414,11 +695,16 @@ def chat_completions(
         }]
     }
 
+
+app.include_router(api)
+
 # ==============================================================================
 # CLI
 # ==============================================================================
 
-FULL_ACCESS_WARNING = """
+def full_access_warning() -> str:
+    """Confirmation text shown before starting in --full mode"""
+    return """
 ⚠️  FULL ACCESS MODE - READ CAREFULLY ⚠️
 
 You are granting an AI complete control over your machine:
@@ -452,8 +738,30 @@ Anyone with your token has full access to your machine.
 
 """
 
+
+def print_banner(level_name: str, level_icon: str, level_warning: str):
+    """Print the startup banner for the current access level"""
+    print(f"""
+╔═════════════════════════════════════════════════════════════╗
+║                       TRAPDOOR 0.1                          ║
+║       Give cloud AIs safe access to your local machine      ║
+╚═════════════════════════════════════════════════════════════╝
+
+{level_icon} Access Level: {level_name.upper()}
+   {ACCESS['description']}{level_warning}
+
+   Permissions:
+   {"✓" if ACCESS["fs_read"] else "✗"} Read files        - Browse and read any file
+   {"✓" if ACCESS["fs_write"] else "✗"} Write files       - Create and modify files
+   {"✓" if ACCESS["fs_delete"] else "✗"} Delete files      - Remove files and directories
+   {"✓" if ACCESS["exec"] else "✗"} Execute commands  - Run shell, scripts, sudo
+
+{"─" * 67}
+""")
+
+
 def main():
-    global ACCESS, PORT
+    global PORT
 
     parser = argparse.ArgumentParser(
         description="Trapdoor - Give cloud AIs safe access to your local machine",
@@ -479,6 +787,7 @@ Examples:
   trapdoor                     # Safe read-only mode
   trapdoor --solid             # Allow file writes
   trapdoor --full -y           # Full access (skip confirmation)
+  trapdoor --full -y -w 4      # Run up to 4 requests in parallel processes
 """
     )
 
@@ -494,6 +803,7 @@ Examples:
     parser.add_argument("-y", "--yes", action="store_true", help="Skip confirmation for --full")
     parser.add_argument("--rotate-token", action="store_true", help="Rotate token on start")
     parser.add_argument("--no-interactive", action="store_true", help="Skip all prompts (for Docker/CI)")
+    parser.add_argument("--workers", "-w", type=int, default=1, help="Worker processes (default: 1)")
 
     args = parser.parse_args()
 
@@ -503,7 +813,7 @@ Examples:
     if args.full:
         # Confirm full access unless -y flag
         if not args.yes and interactive:
-            print(FULL_ACCESS_WARNING)
+            print(full_access_warning())
             try:
                 response = input("Type 'yes' to continue with full access: ")
                 if response.lower() != 'yes':
@@ -514,21 +824,20 @@ Examples:
                 return
             print()
 
-        ACCESS = LEVELS["full"]
         level_name = "full"
         level_icon = "🔓"
         level_warning = "\n   ⚠️  AI can execute ANY command on your machine!"
     elif args.solid:
-        ACCESS = LEVELS["solid"]
         level_name = "solid"
         level_icon = "🔐"
         level_warning = ""
     else:
-        ACCESS = LEVELS["limited"]
         level_name = "limited"
         level_icon = "🔒"
         level_warning = ""
 
+    set_access(level_name)
+
     # Sandbox root
     set_root(args.root)
 
@@ -543,24 +852,7 @@ Examples:
     if PORT != requested_port:
         print(f"⚡ Port {requested_port} in use, using {PORT}")
 
-    # Print banner
-    print(f"""
-╔═════════════════════════════════════════════════════════════╗
-║                       TRAPDOOR 0.1                          ║
-║       Give cloud AIs safe access to your local machine      ║
-╚═════════════════════════════════════════════════════════════╝
-
-{level_icon} Access Level: {level_name.upper()}
-   {ACCESS['description']}{level_warning}
-
-   Permissions:
-   {"✓" if ACCESS["fs_read"] else "✗"} Read files        - Browse and read any file
-   {"✓" if ACCESS["fs_write"] else "✗"} Write files       - Create and modify files
-   {"✓" if ACCESS["fs_delete"] else "✗"} Delete files      - Remove files and directories
-   {"✓" if ACCESS["exec"] else "✗"} Execute commands  - Run shell, scripts, sudo
-
-{"─" * 67}
-""")
+    print_banner(level_name, level_icon, level_warning)
 
     if interactive:
         # Ask about exposure
@@ -679,7 +971,23 @@ td.ls("~")
     print("\nPress Ctrl+C to stop.\n")
 
     try:
-        uvicorn.run(app, host=args.host, port=PORT)
+        if args.workers > 1:
+            # Workers are fresh interpreters that re-import this module,
+            # so hand them the CLI choices through the environment
+            os.environ[WORKER_ACCESS_ENV] = ACCESS_NAME
+            os.environ[WORKER_ROOT_ENV] = str(ROOT)
+
+        uvicorn.run(
+            "server:app" if args.workers > 1 else app,
+            host=args.host,
+            port=PORT,
+            workers=args.workers,
+            # "auto" picks uvloop/httptools from uvicorn[standard] when they are
+            # installed (not on Windows or PyPy) and falls back to asyncio/h11
+            loop="auto",
+            http="auto",
+            access_log=False,
+        )
     finally:
         if tunnel_process:
             tunnel_process.terminate()